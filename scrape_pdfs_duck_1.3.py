@@ -3,14 +3,24 @@
 scrape_pdfs_duck8_dedupe.py
 
 Reads a CSV sight‐reading list (Level,Composer,Title), then for each piece:
-  1) Tries DuckDuckGo (via duckduckgo-search’s DDGS, falls back to HTML scrape)
+  1) Tries DuckDuckGo’s HTML search endpoint
   2) Tries IMSLP’s built-in search page
   3) Tries Internet Archive’s API
   4) Tries Mutopia Project’s search page
-
-If none yield PDFs, it then shortens the title one word at a time
-(from the end) and retries the full cascade, until it either finds
-up to MAX_PDFS_PER_PIECE **unique‐size** PDFs or the title is one word.
+(queried concurrently in waves: the first few DuckDuckGo queries together
+with the other three sources, then DDG_WAVE_SIZE more DuckDuckGo queries
+per wave; their PDF links are pooled)
+
+After each wave the pooled links are ranked by how many title words they
+contain plus a per-source priority, and downloaded best first; no further
+wave is sent once the piece has enough PDFs.  If all waves together
+aren't enough, it shortens the title one word at a time (from the end),
+adds the new links to the same pool and downloads the best untried ones,
+until it either has up to MAX_PDFS_PER_PIECE **unique** PDFs or the
+title is one word.
+(PDFs count as duplicates when both their size and a sha1 of their first
+FINGERPRINT_BYTES match; fingerprints of files already downloaded are
+kept in pdfs/dedupe_index.json between runs.)
 
 Downloads into a `pdfs/` folder naming:
   Level - Title - Composer - oldfilename.pdf
@@ -18,17 +28,33 @@ Downloads into a `pdfs/` folder naming:
 Also reports, in real time, how many PDFs were downloaded via each source,
 and if after all fallbacks a piece still has fewer than MAX_PDFS_PER_PIECE
 PDFs, moves its CSV entry to the bottom for the next run.
+
+All network I/O runs on asyncio + aiohttp: up to PIECE_CONCURRENCY pieces
+are processed at once over one pooled ClientSession.
+
+Requires (pip install ...):
+  "aiohttp>=3.12" aiodns aiofiles aiolimiter "httpx[http2]" selectolax
+(aiohttp 3.12 added TCPConnector's socket_factory, used for SOCKET_OPTIONS.
+aiodns backs the connector's AsyncResolver and httpx[http2] pulls in h2
+for the IMSLP client; both fail at startup without them.  selectolax is
+used through its Lexbor backend, which works on 0.3.x and 1.x alike.)
 """
 
+import asyncio
 import csv
 import os
 import re
-import time
-import glob
-import requests
-from requests.exceptions import RequestException, ReadTimeout
-from duckduckgo_search import DDGS
-from bs4 import BeautifulSoup
+import socket
+import functools
+import hashlib
+import html
+import json
+from collections import OrderedDict, defaultdict
+import aiofiles
+import aiohttp
+import httpx
+from aiolimiter import AsyncLimiter
+from selectolax.lexbor import LexborHTMLParser
 from urllib.parse import quote, urlparse, parse_qs, unquote
 
 # ------------------------------------------------------------------
@@ -36,182 +62,514 @@ from urllib.parse import quote, urlparse, parse_qs, unquote
 # ------------------------------------------------------------------
 INPUT_CSV            = 'sightreading_list.csv'
 OUTPUT_DIR           = 'pdfs'
+DEDUPE_INDEX         = os.path.join(OUTPUT_DIR, 'dedupe_index.json')
+FINGERPRINT_BYTES    = 65536  # sha1 of this many leading bytes tells same-size PDFs apart
 MAX_PDFS_PER_PIECE   = 3
 RESULTS_PER_QUERY    = 30
-DOWNLOAD_DELAY       = 1     # seconds between downloads
-ENTRY_DELAY          = 1     # seconds between each piece
-DDGS_PAUSE           = 1     # seconds before each DDGS call
+HOST_RATE            = 2     # requests allowed per host ...
+HOST_RATE_PERIOD     = 1     # ... per this many seconds
+PIECE_CONCURRENCY    = 8     # pieces processed at the same time
+DDG_CONCURRENCY      = 3     # DuckDuckGo queries in flight at once
+DOWNLOAD_CONCURRENCY = 4     # PDF downloads in flight at once
+SEARCH_CACHE_SIZE    = 4096  # remembered queries per search function
+DDG_WAVE_SIZE        = DDG_CONCURRENCY  # DDG queries issued per ranking round
+PROBE_WINDOW         = 8     # best-ranked candidates HEAD-probed per round
+SOURCE_PRIORITY      = {     # added to a candidate's title-word score
+    'DDG':     3,
+    'IMSLP':   2,
+    'Archive': 1,
+    'Mutopia': 0
+}
+DOWNLOAD_CHUNK_SIZE  = 262144            # 256 KiB per streamed chunk
+SMALL_PDF_SIZE       = 4 * 1024 * 1024   # read in one go below this size
 HTML_ENDPOINT        = 'https://duckduckgo.com/html/'
+DDG_TIMEOUT          = 2     # seconds per DuckDuckGo query
 HEADERS              = {
     'User-Agent': 'Mozilla/5.0',
     'Referer': 'https://duckduckgo.com/html/'
 }
 
+# DuckDuckGo query templates, tried for every title variant.
+_TEMPLATE_LIST = [
+    # English
+    "{title} {composer} sheet music pdf",
+    "{title} {composer} piano sheet music",
+    "{title} {composer} piano sheet music pdf",
+    "{title} {composer} score pdf download",
+    "{title} {composer} full score pdf",
+    "{title} {composer} piano score pdf",
+    "{title} {composer} pdf",
+    "{title} {composer} piano solo pdf",
+    "{title} {composer} piano pdf",
+    "{title} pdf sheet music",
+    "{title} {composer} pdf partition",
+    "{title} {composer} partition piano",
+    "{title} {composer} piano partition pdf",
+    "{title} {composer} partituras pdf download",
+    "{title} {composer} partituras pdf",
+    "{title} {composer} piano notenblätter pdf",
+    # Spanish
+    "{title} {composer} partituras piano pdf",
+    "{title} {composer} partitura piano pdf",
+    # French
+    "{title} {composer} partition pdf",
+    "{title} {composer} partition piano pdf",
+    # Italian
+    "{title} {composer} spartito pdf",
+    "{title} {composer} spartito pianoforte pdf",
+    # Portuguese
+    "{title} {composer} partitura pdf",
+    "{title} {composer} partitura piano pdf",
+    # German
+    "{title} {composer} notenblätter pdf",
+    "{title} {composer} notenblatt pdf",
+    # Russian
+    "{title} {composer} ноты pdf",
+    "{title} {composer} ноты пианино pdf",
+    # Chinese
+    "{title} {composer} 乐谱 pdf",
+    "{title} {composer} 钢琴 乐谱 pdf",
+    # Japanese
+    "{title} {composer} 楽譜 pdf",
+    "{title} {composer} ピアノ 乐谱 pdf",
+    # Arabic
+    "{title} {composer} نوتة موسيقية pdf",
+    "{title} {composer} pdf",
+]
+# Every template costs a DDG round trip per title variant, so drop repeats.
+TEMPLATES = tuple(dict.fromkeys(_TEMPLATE_LIST))
+
+# ------------------------------------------------------------------
+# HTTP SESSION
+# ------------------------------------------------------------------
+# One pooled aiohttp session (built in main) carries every request, so
+# repeated hits on the same few hosts reuse their TCP+TLS connections.
+# Its connector resolves hosts with aiodns and caches the answers, since
+# the whole run only ever talks to a handful of hosts.
+CONNECTOR_LIMIT          = 32
+CONNECTOR_LIMIT_PER_HOST = 4
+KEEPALIVE_TIMEOUT        = 60    # seconds an idle pooled connection is kept
+DNS_CACHE_TTL            = 3600  # seconds a resolved host is reused
+
+# Applied to every socket we open (aiohttp and httpx): no Nagle delay
+# on small requests, and TCP keepalive probes so NAT boxes don't
+# silently drop pooled connections on long runs.
+SOCKET_OPTIONS = [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+]
+
+def keepalive_socket(addr_info) -> socket.socket:
+    """socket_factory for aiohttp's TCPConnector: a socket with SOCKET_OPTIONS set."""
+    family, type_, proto, _, _ = addr_info
+    sock = socket.socket(family=family, type=type_, proto=proto)
+    for level, opt, value in SOCKET_OPTIONS:
+        sock.setsockopt(level, opt, value)
+    return sock
+
+# Shared by every piece, so DuckDuckGo sees at most DDG_CONCURRENCY
+# queries at a time no matter how many pieces are running.
+DDG_SEMAPHORE = asyncio.Semaphore(DDG_CONCURRENCY)
+DOWNLOAD_SEMAPHORE = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+
+# Throttling is per host: a download from archive.org never waits on a
+# DuckDuckGo query, only on other requests to archive.org.
+_HOST_LIMITERS: dict[str, AsyncLimiter] = {}
+
+def host_limiter(url: str) -> AsyncLimiter:
+    host = urlparse(url).netloc
+    limiter = _HOST_LIMITERS.get(host)
+    if limiter is None:
+        limiter = _HOST_LIMITERS[host] = AsyncLimiter(HOST_RATE, HOST_RATE_PERIOD)
+    return limiter
+
+# IMSLP speaks HTTP/2, so its search and piece pages go through one
+# long-lived httpx client that multiplexes them over a single connection.
+# That saves handshakes, not server work, so imslp.org stays at HOST_RATE
+# like every other host; the limiter, not the connection, sets the pace.
+IMSLP_MAX_KEEPALIVE   = 8
+IMSLP_MAX_CONNECTIONS = 32
+_IMSLP_CLIENT: httpx.AsyncClient | None = None
+
+def imslp_client() -> httpx.AsyncClient:
+    global _IMSLP_CLIENT
+    if _IMSLP_CLIENT is None:
+        transport = httpx.AsyncHTTPTransport(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=IMSLP_MAX_KEEPALIVE,
+                                max_connections=IMSLP_MAX_CONNECTIONS,
+                                keepalive_expiry=KEEPALIVE_TIMEOUT),
+            socket_options=SOCKET_OPTIONS
+        )
+        _IMSLP_CLIENT = httpx.AsyncClient(
+            transport=transport,
+            headers=HEADERS,
+            timeout=10,
+            follow_redirects=True
+        )
+    return _IMSLP_CLIENT
+
+async def close_imslp_client() -> None:
+    global _IMSLP_CLIENT
+    if _IMSLP_CLIENT is not None:
+        await _IMSLP_CLIENT.aclose()
+        _IMSLP_CLIENT = None
+
+def make_session() -> aiohttp.ClientSession:
+    # must be called with the event loop running (AsyncResolver binds to it)
+    connector = aiohttp.TCPConnector(
+        limit=CONNECTOR_LIMIT,
+        limit_per_host=CONNECTOR_LIMIT_PER_HOST,
+        keepalive_timeout=KEEPALIVE_TIMEOUT,
+        socket_factory=keepalive_socket,
+        resolver=aiohttp.AsyncResolver(),
+        use_dns_cache=True,
+        ttl_dns_cache=DNS_CACHE_TTL
+    )
+    return aiohttp.ClientSession(connector=connector, headers=HEADERS)
+
 # ------------------------------------------------------------------
 # HELPERS
 # ------------------------------------------------------------------
+# Compiled once here rather than on every call in the inner loops.
+_SANITIZE_TABLE = str.maketrans('', '', '\\/*?:"<>|')
+_WORD           = re.compile(r'\w+')
+_PUNCT          = re.compile(r'[^\w\s]')
+_IMSLP_FP       = re.compile(r'/index\.php\?title=Special:FilePath/.+\.pdf')
+_DDG_LINK       = re.compile(rb'<a[^>]+class="result__a"[^>]+href="([^"]+)"')
+_SHEET_KEYWORDS = ("piano", "arranged", "composer", "score", "sheet", "music")
+
 def sanitize_filename(s: str) -> str:
-    return re.sub(r'[\\/*?:"<>|]', "", s)
+    return s.translate(_SANITIZE_TABLE)
 
 def extract_real_url(ddg_href: str) -> str:
     p = urlparse(ddg_href)
     qs = parse_qs(p.query)
     return unquote(qs.get('uddg', [ddg_href])[0])
 
-def is_relevant_pdf(url: str, title: str, composer: str) -> bool:
+def remote_filename(url: str) -> str:
+    """
+    Filename part of a PDF URL.  IMSLP download links all have the path
+    /index.php, so for those the name comes from the Special:FilePath/
+    title instead.
+    """
+    p = urlparse(url)
+    name = os.path.basename(p.path)
+    page = parse_qs(p.query).get('title', [''])[0]
+    if page.startswith('Special:FilePath/'):
+        name = page[len('Special:FilePath/'):]
+    return sanitize_filename(name)
+
+def title_variants(title: str) -> list[str]:
+    """The full title, then the title with words trimmed off the end, down to one."""
+    words = title.split()
+    return [title] + [" ".join(words[:n]) for n in range(len(words) - 1, 0, -1)]
+
+def title_words(title: str) -> frozenset[str]:
+    return frozenset(_WORD.findall(title.lower()))
+
+def composer_key(composer: str) -> str:
+    return composer.lower().replace(" ", "")
+
+def is_relevant_pdf(url: str, words: frozenset[str], comp: str) -> bool:
     """
     Very basic filter: the URL must contain
       • at least half the words from the title, OR
       • the composer's name, OR
       • one of the generic sheet-music keywords.
+
+    words/comp come from title_words()/composer_key(), computed once per
+    title rather than once per URL.  The single-substring tests run first;
+    the per-word title count only when neither of them matches.
     """
     text = unquote(url).lower()
 
-    # 1) Title words
-    words = re.findall(r'\w+', title.lower())
-    match_count = sum(1 for w in words if w in text)
-    if match_count >= len(words) / 2:
+    # 1) Composer (no spaces)
+    if comp in text:
         return True
 
-    # 2) Composer (no spaces)
-    comp = composer.lower().replace(" ", "")
-    if comp in text:
+    # 2) Generic keywords
+    if any(kw in text for kw in _SHEET_KEYWORDS):
         return True
 
-    # 3) Generic keywords
-    for kw in ("piano", "arranged", "composer", "score", "sheet", "music"):
-        if kw in text:
-            return True
+    # 3) Title words
+    match_count = sum(1 for w in words if w in text)
+    return match_count >= len(words) / 2
 
-    return False
+def memoize_search(func):
+    """
+    Remember a search coroutine's result per argument tuple for the rest
+    of the run (the session argument is not part of the key).  Callers
+    asking for a query that is still in flight share the same task; it is
+    only cancelled once every caller waiting on it has been cancelled.
+    Failed or cancelled lookups are not cached.
+    """
+    cache = OrderedDict()   # key -> [task, number of callers waiting]
+
+    @functools.wraps(func)
+    async def wrapper(session, *args, **kwargs):
+        key = (args, tuple(sorted(kwargs.items())))
+        entry = cache.get(key)
+        if entry is None or (entry[0].done() and
+                             (entry[0].cancelled() or entry[0].exception())):
+            entry = [asyncio.ensure_future(func(session, *args, **kwargs)), 0]
+            cache[key] = entry
+            if len(cache) > SEARCH_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
 
-def ddg_html_search(query: str, max_results: int = RESULTS_PER_QUERY):
-    try:
-        resp = requests.get(
+        task = entry[0]
+        entry[1] += 1
+        try:
+            return list(await asyncio.shield(task))
+        except asyncio.CancelledError:
+            if entry[1] == 1 and not task.done():
+                task.cancel()
+                if cache.get(key) is entry:
+                    del cache[key]
+            raise
+        finally:
+            entry[1] -= 1
+    return wrapper
+
+@memoize_search
+async def ddg_html_search(session: aiohttp.ClientSession, query: str,
+                          max_results: int = RESULTS_PER_QUERY):
+    """
+    PDF links from DuckDuckGo's HTML endpoint.  The endpoint needs no vqd
+    token; cookies DuckDuckGo sets stay in the shared session's cookie jar
+    and are sent back on later queries.  Errors propagate, so a failed
+    query isn't memoized.
+    """
+    async with DDG_SEMAPHORE:
+        print(f"  • DDG query: {query}")
+        async with host_limiter(HTML_ENDPOINT), session.get(
             HTML_ENDPOINT,
             params={'q': query},
-            headers=HEADERS,
-            timeout=2
-        )
-        resp.raise_for_status()
-    except (ReadTimeout, RequestException) as e:
-        print(f"      ⚠ DDG HTML failed ({e!r}), skipping")
-        return []
+            timeout=aiohttp.ClientTimeout(total=DDG_TIMEOUT)
+        ) as resp:
+            resp.raise_for_status()
+            body = await resp.read()
 
-    soup = BeautifulSoup(resp.text, 'html.parser')
+    # one regex pass over the raw bytes instead of building a DOM
     pdfs = []
-    for a in soup.find_all('a', class_='result__a', href=True):
-        real = extract_real_url(a['href'])
+    for href in _DDG_LINK.findall(body):
+        real = extract_real_url(html.unescape(href.decode('utf-8', 'replace')))
         if real.lower().endswith('.pdf'):
             pdfs.append(real)
             if len(pdfs) >= max_results:
                 break
     return pdfs
 
-class DDGSTimeout(DDGS):
-    def __enter__(self):
-        super().__enter__()
-        orig = self.session.request
-        def timed_request(method, url, **kwargs):
-            kwargs.setdefault("timeout", 2)
-            return orig(method, url, **kwargs)
-        self.session.request = timed_request
-        return self
-
-def ddg_search_pdf_urls(query: str, max_results: int = RESULTS_PER_QUERY):
-    time.sleep(DDGS_PAUSE)
+ddg_search_pdf_urls = ddg_html_search
+
+async def get_remote_pdf_size(session: aiohttp.ClientSession, url: str) -> int | None:
     try:
-        pdfs = []
-        with DDGSTimeout() as ddgs:
-            for res in ddgs.text(query, max_results=max_results):
-                href = res.get('href','')
-                if href.lower().endswith('.pdf'):
-                    pdfs.append(href)
-                    if len(pdfs) >= max_results:
-                        break
-        if pdfs:
-            return pdfs
+        async with host_limiter(url), session.head(
+            url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=10)
+        ) as r:
+            cl = r.headers.get('Content-Length')
+            return int(cl) if cl and cl.isdigit() else None
     except Exception:
-        pass
-    return ddg_html_search(query, max_results)
+        return None
 
-def get_remote_pdf_size(url: str) -> int | None:
+async def get_remote_fingerprint(session: aiohttp.ClientSession, url: str,
+                                 size: int) -> str | None:
+    """sha1 of the first FINGERPRINT_BYTES of url, fetched with a Range request."""
+    want = min(size, FINGERPRINT_BYTES)
     try:
-        r = requests.head(url, headers=HEADERS, timeout=10, allow_redirects=True)
-        cl = r.headers.get('Content-Length')
-        return int(cl) if cl and cl.isdigit() else None
+        async with host_limiter(url), session.get(
+            url, headers={'Range': f'bytes=0-{want - 1}'},
+            timeout=aiohttp.ClientTimeout(sock_connect=10, sock_read=10)
+        ) as r:
+            if r.status not in (200, 206):
+                return None
+            return hashlib.sha1(await r.content.readexactly(want)).hexdigest()
     except Exception:
         return None
 
-def maybe_download_pdf(url: str, dest_path: str, seen_sizes: set[int]) -> bool:
-    size = get_remote_pdf_size(url)
-    if size is not None and size in seen_sizes:
-        print(f"      ↳ Skipping duplicate (size={size})")
-        return False
+def fingerprint_file(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read(FINGERPRINT_BYTES)).hexdigest()
+
+async def head_many(session: aiohttp.ClientSession, urls: list[str]) -> list[int | None]:
+    """HEAD every URL in one concurrent batch; sizes come back in input order."""
+    return await asyncio.gather(*[get_remote_pdf_size(session, u) for u in urls])
+
+async def maybe_download_pdf(session: aiohttp.ClientSession, url: str,
+                             dest_path: str, seen: dict[int, set[str]],
+                             size: int | None = None,
+                             tag: str = '') -> tuple[int, str] | None:
+    """Download url unless it duplicates a PDF already in seen.
+
+    seen maps size -> sha1 fingerprints of the piece's PDFs.  size is the
+    Content-Length from an earlier HEAD probe (see head_many), or None if
+    unknown.  A size match alone is not treated as a duplicate: the first
+    FINGERPRINT_BYTES are fetched and compared first.  Returns the new
+    file's (size, fingerprint), or None if nothing was saved.  tag
+    prefixes every log line, e.g. the piece it is downloading for.
+    """
+    if size is not None and size in seen:
+        digest = await get_remote_fingerprint(session, url, size)
+        if digest is None or digest in seen[size]:
+            print(f"      {tag}↳ Skipping duplicate (size={size})")
+            return None
 
     try:
-        r = requests.get(url, stream=True, timeout=15, headers=HEADERS)
-        ctype = r.headers.get('Content-Type','').lower()
-        if r.status_code == 200 and 'pdf' in ctype:
-            with open(dest_path, 'wb') as f:
-                for chunk in r.iter_content(8192):
-                    f.write(chunk)
-            if size is None:
+        async with host_limiter(url), session.get(
+            # connect / read-idle limits like requests' timeout=15; a total
+            # would fail every PDF that takes over 15 s to transfer
+            url, timeout=aiohttp.ClientTimeout(sock_connect=15, sock_read=15)
+        ) as r:
+            ctype = r.headers.get('Content-Type','').lower()
+            if r.status == 200 and 'pdf' in ctype:
+                async with aiofiles.open(dest_path, 'wb') as f:
+                    if size is not None and size < SMALL_PDF_SIZE:
+                        # typical sheet music: one read, one write
+                        await f.write(await r.read())
+                    else:
+                        async for chunk in r.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            await f.write(chunk)
                 size = os.path.getsize(dest_path)
-            if size in seen_sizes:
-                os.remove(dest_path)
-                print(f"      ↳ Removed duplicate after download (size={size})")
-                return False
-            seen_sizes.add(size)
-            print(f"      ✅ Saved (size={size}): {os.path.basename(dest_path)}")
-            return True
+                digest = fingerprint_file(dest_path)
+                if digest in seen.get(size, ()):
+                    os.remove(dest_path)
+                    print(f"      {tag}↳ Removed duplicate after download (size={size})")
+                    return None
+                seen.setdefault(size, set()).add(digest)
+                print(f"      {tag}✅ Saved (size={size}): {os.path.basename(dest_path)}")
+                return size, digest
     except Exception:
         pass
 
-    print("      ❌ Failed download")
-    return False
+    print(f"      {tag}❌ Failed download")
+    return None
 
 # ------------------------------------------------------------------
-# DEBUGGED FALLBACKS
+# DEDUPE INDEX
 # ------------------------------------------------------------------
-import re as _re
-from urllib.parse import quote as _quote
+# dedupe_index.json maps each PDF filename in OUTPUT_DIR to
+# [size, mtime_ns, sha1 fingerprint], so restarting a run doesn't have to
+# re-hash files that haven't changed.
+def load_dedupe_index() -> dict[str, list]:
+    try:
+        with open(DEDUPE_INDEX, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_dedupe_index(index: dict[str, list]) -> None:
+    tmp = DEDUPE_INDEX + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    os.replace(tmp, DEDUPE_INDEX)
+
+def piece_prefix(level: str, safe_title: str, safe_comp: str) -> str:
+    return f"{level} - {safe_title} - {safe_comp} - "
 
-def search_imslp(title: str, composer: str, max_results: int = RESULTS_PER_QUERY):
+def match_piece(name: str, prefixes: dict[str, tuple]):
+    """
+    Key of the piece whose filename prefix name starts with, if any.
+
+    Titles (and remote filenames) may themselves contain ' - ', so the
+    name can't be split into fields; instead every ' - ' is tried as the
+    end of a prefix, shortest first.
+    """
+    pos = name.find(' - ')
+    while pos != -1:
+        key = prefixes.get(name[:pos + 3])
+        if key is not None:
+            return key
+        pos = name.find(' - ', pos + 1)
+    return None
+
+def scan_output_dir(prefixes: dict[str, tuple], index: dict[str, list]):
+    """
+    One pass over OUTPUT_DIR: bucket every existing PDF under the piece it
+    belongs to, as a list of (size, fingerprint).  index is refreshed in
+    place for the files seen.
+    """
+    buckets = defaultdict(list)
+    fresh = {}
+    with os.scandir(OUTPUT_DIR) as entries:
+        for e in entries:
+            if not e.name.endswith('.pdf') or not e.is_file():
+                continue
+            key = match_piece(e.name, prefixes)
+            if key is None:
+                continue
+            st = e.stat()
+            cached = index.get(e.name)
+            if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                digest = cached[2]
+            else:
+                digest = fingerprint_file(e.path)
+            fresh[e.name] = [st.st_size, st.st_mtime_ns, digest]
+            buckets[key].append((st.st_size, digest))
+    index.clear()
+    index.update(fresh)
+    return buckets
+
+# ------------------------------------------------------------------
+# DEBUGGED FALLBACKS
+# ------------------------------------------------------------------
+@memoize_search
+async def search_imslp(session: aiohttp.ClientSession, title: str, composer: str,
+                       max_results: int = RESULTS_PER_QUERY):
+    # session is unused: IMSLP traffic goes over the HTTP/2 imslp_client()
+    client = imslp_client()
     def clean(q):
-        return _quote(_re.sub(r"[^\w\s]", "", q))
-    def do_search(qstr):
+        return quote(_PUNCT.sub("", q))
+    async def do_search(qstr):
         url = f"https://imslp.org/index.php?title=Special:Search&search={clean(qstr)}"
         print(f"[DEBUG][IMSLP] searching → {url}")
-        r = requests.get(url, headers=HEADERS, timeout=10); r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
-        divs = soup.find_all("div", class_="mw-search-result-heading")
-        return [div.find("a")["href"] for div in divs if div.find("a")]
-    hits = do_search(f"{title} {composer}")
+        async with host_limiter(url):
+            r = await client.get(url)
+        r.raise_for_status()
+        tree = LexborHTMLParser(r.text)
+        hits = []
+        for div in tree.css("div.mw-search-result-heading"):
+            a = div.css_first("a")
+            if a is not None and a.attributes.get("href"):
+                hits.append(a.attributes["href"])
+        return hits
+    hits = await do_search(f"{title} {composer}")
     if not hits:
         print("[DEBUG][IMSLP] no hits with composer, retrying title-only")
-        hits = do_search(title)
-    pdfs = []
-    for rel in hits[:max_results]:
+        hits = await do_search(title)
+    async def piece_pdf(rel):
         page_url = "https://imslp.org" + rel
         print(f"[DEBUG][IMSLP] visiting piece page → {page_url}")
-        pr = requests.get(page_url, headers=HEADERS, timeout=10)
-        ps = BeautifulSoup(pr.text, "html.parser")
-        fp = ps.find("a", href=_re.compile(r"/index\.php\?title=Special:FilePath/.+\.pdf"))
-        if fp:
-            pdfs.append("https://imslp.org" + fp["href"])
-        if len(pdfs) >= max_results:
-            break
+        try:
+            async with host_limiter(page_url):
+                pr = await client.get(page_url)
+        except httpx.HTTPError as e:
+            print(f"[DEBUG][IMSLP] piece page failed ({e!r})")
+            return None
+        hrefs = (a.attributes.get("href") or "" for a in LexborHTMLParser(pr.text).css("a[href]"))
+        fp = next((h for h in hrefs if _IMSLP_FP.search(h)), None)
+        return "https://imslp.org" + fp if fp else None
+    # all piece pages at once, as concurrent streams on the HTTP/2
+    # connection; gather keeps the search-hit order
+    found = await asyncio.gather(*[piece_pdf(rel) for rel in hits[:max_results]])
+    pdfs = [url for url in found if url]
     print(f"[DEBUG][IMSLP] total PDFs found: {len(pdfs)}")
     return pdfs
 
-def search_archive_org(title: str, composer: str, max_results: int = 10):
+@memoize_search
+async def search_archive_org(session: aiohttp.ClientSession, title: str, composer: str,
+                             max_results: int = 10):
     endpoint = "https://archive.org/advancedsearch.php"
     q = f'"{title}" "{composer}" AND mediatype:texts'
     params = {'q': q, 'fl[]': 'identifier', 'rows': max_results, 'output': 'json'}
     print(f"[DEBUG][ARCHIVE] GET {endpoint} params={params}")
-    r = requests.get(endpoint, params=params, headers=HEADERS, timeout=10); r.raise_for_status()
-    docs = r.json().get('response', {}).get('docs', [])
+    async with host_limiter(endpoint), session.get(
+        endpoint, params=params, timeout=aiohttp.ClientTimeout(total=10)
+    ) as r:
+        r.raise_for_status()
+        data = await r.json(content_type=None)
+    docs = data.get('response', {}).get('docs', [])
     print(f"[DEBUG][ARCHIVE] docs returned: {len(docs)}")
     pdfs = []
     for doc in docs:
@@ -223,14 +581,20 @@ def search_archive_org(title: str, composer: str, max_results: int = 10):
     print(f"[DEBUG][ARCHIVE] PDFs built: {len(pdfs)}")
     return pdfs
 
-def search_mutopia(title: str, composer: str, max_results: int = RESULTS_PER_QUERY):
-    url = f"http://www.mutopiaproject.org/cgibin/piece-info.cgi?searchtext={_quote(title)}"
+@memoize_search
+async def search_mutopia(session: aiohttp.ClientSession, title: str, composer: str,
+                         max_results: int = RESULTS_PER_QUERY):
+    url = f"http://www.mutopiaproject.org/cgibin/piece-info.cgi?searchtext={quote(title)}"
     print(f"[DEBUG][MUTOPIA] GET {url}")
-    r = requests.get(url, headers=HEADERS, timeout=10); r.raise_for_status()
-    soup = BeautifulSoup(r.text, 'html.parser')
+    async with host_limiter(url), session.get(
+        url, timeout=aiohttp.ClientTimeout(total=10)
+    ) as r:
+        r.raise_for_status()
+        text = await r.text()
+    tree = LexborHTMLParser(text)
     pdfs = []
-    for a in soup.select('a[href$=".pdf"]'):
-        href = a['href']
+    for a in tree.css('a[href$=".pdf"]'):
+        href = a.attributes['href']
         pdfs.append(href if href.startswith('http') else 'http://www.mutopiaproject.org'+href)
         if len(pdfs) >= max_results:
             break
@@ -240,201 +604,237 @@ def search_mutopia(title: str, composer: str, max_results: int = RESULTS_PER_QUE
 # ------------------------------------------------------------------
 # MAIN
 # ------------------------------------------------------------------
-def main():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-
-    # counters for real-time report
-    counters = {
-        'DDG':       0,
-        'IMSLP':     0,
-        'Archive':   0,
-        'Mutopia':   0
-    }
-
-    templates = [
-       # English
-       # English
-    "{title} {composer} sheet music pdf",
-    "{title} {composer} piano sheet music",
-    "{title} {composer} piano sheet music pdf",
-"{title} {composer} score pdf download",
-"{title} {composer} full score pdf",
-"{title} {composer} piano score pdf",
-"{title} {composer} pdf",
-"{title} {composer} piano solo pdf",
-"{title} {composer} piano pdf",
-"{title} pdf sheet music",
-"{title} {composer} pdf partition",
-"{title} {composer} partition piano",
-"{title} {composer} piano partition pdf",
-"{title} {composer} partituras pdf download",
-"{title} {composer} partituras pdf",
-"{title} {composer} piano notenblätter pdf",
-### Spanish
-"{title} {composer} partituras piano pdf",
-"{title} {composer} partitura piano pdf",
-### French
-"{title} {composer} partition pdf",
-"{title} {composer} partition piano pdf",
-### Italian
-"{title} {composer} spartito pdf",
-"{title} {composer} spartito pianoforte pdf",
-### Portuguese
-"{title} {composer} partitura pdf",
-"{title} {composer} partitura piano pdf",
-### German
-"{title} {composer} notenblätter pdf",
-"{title} {composer} notenblatt pdf",
-### Russian
-"{title} {composer} ноты pdf",
-"{title} {composer} ноты пианино pdf",
-### Chinese
-"{title} {composer} 乐谱 pdf",
-"{title} {composer} 钢琴 乐谱 pdf",
-### Japanese
-"{title} {composer} 楽譜 pdf",
-"{title} {composer} ピアノ 乐谱 pdf",
-#
-## Arabic
-"{title} {composer} نوتة موسيقية pdf"
-"{title} {composer} pdf",
-    ]
-
-    # read all entries (no header row)
-    with open(INPUT_CSV, newline='', encoding='utf-8') as csvfile:
-        reader = csv.reader(csvfile)
-        rows = list(reader)
-
-    complete_rows = []
-    incomplete_rows = []
+def piece_fields(row):
+    """(level, composer, title) of a CSV row, plus its dedupe-bucket key."""
+    level, composer, title = row[0].strip(), row[1].strip(), row[2].strip()
+    return level, composer, title, (level, sanitize_filename(title), sanitize_filename(composer))
+
+async def process_piece(row, session: aiohttp.ClientSession, sem: asyncio.Semaphore,
+                        counters: dict, existing: list[tuple[int, str]],
+                        index: dict[str, list]) -> bool:
+    """
+    Run the full search cascade for one CSV row; True if it is complete.
+    existing is the piece's bucket from scan_output_dir; index gets an
+    entry for every new PDF saved.
+    """
+    async with sem:
+        level, composer, title, (_, safe_title, safe_comp) = piece_fields(row)
 
-    for row in rows:
-        level, composer, title = row[0].strip(), row[1].strip(), row[2].strip()
+        # loop invariants for every candidate URL of this piece
+        comp_key = composer_key(composer)
 
         # Resume: skip or pick up where left off
-        pattern = f"{level} - {sanitize_filename(title)} - {sanitize_filename(composer)} - *.pdf"
-        existing = glob.glob(os.path.join(OUTPUT_DIR, pattern))
-        seen_sizes = set()
-        for fp in existing:
-            try:
-                seen_sizes.add(os.path.getsize(fp))
-            except Exception:
-                pass
+        seen = {}
+        for size, digest in existing:
+            seen.setdefault(size, set()).add(digest)
         saved = len(existing)
         if saved >= MAX_PDFS_PER_PIECE:
             print(f"\n▶ Skipping “{title}” — already have {saved} PDFs")
-            complete_rows.append(row)
-            continue
+            return True
 
         print(f"\n▶ Processing: {title} — {composer} (Level {level})")
 
-        def try_search(curr_title):
-            nonlocal saved, counters
-
-            # 1) DuckDuckGo
-            for tmpl in templates:
+        # downloads of up to PIECE_CONCURRENCY pieces interleave, so every
+        # per-piece line says which piece it belongs to
+        tag = f"[L{level} {title}] "
+
+        lock = asyncio.Lock()
+        full_words = title_words(title)
+        pool = {}      # url -> (score, source, label), over all title variants
+        tried = set()  # URLs already probed for this piece
+        claimed = set()  # output filenames taken by this piece's downloads
+
+        def claim_filename(url):
+            """Reserve an output filename no other download can also write to."""
+            prefix = piece_prefix(level, safe_title, safe_comp)
+            base, ext = os.path.splitext(remote_filename(url))
+            fn, n = prefix + base + ext, 1
+            while fn in claimed or os.path.exists(os.path.join(OUTPUT_DIR, fn)):
+                fn = f"{prefix}{base} ({n}){ext}"
+                n += 1
+            claimed.add(fn)
+            return fn
+
+        def score(url, source):
+            text = unquote(url).lower()
+            return sum(1 for w in full_words if w in text) + SOURCE_PRIORITY[source]
+
+        async def fetch(source, label, url, size):
+            nonlocal saved
+            async with DOWNLOAD_SEMAPHORE:
                 if saved >= MAX_PDFS_PER_PIECE:
+                    return   # filled while waiting for a download slot
+                # claimed before the first await, so concurrent downloads of
+                # same-named files never share (or delete) one path
+                fn = claim_filename(url)
+                path = os.path.join(OUTPUT_DIR, fn)
+                fp = await maybe_download_pdf(session, url, path, seen, size, tag)
+                if not fp:
+                    # nothing kept: drop any partial file and free the name
+                    if os.path.exists(path):
+                        os.remove(path)
+                    claimed.discard(fn)
                     return
-                q = tmpl.format(title=curr_title, composer=composer)
-                print(f"  • DDG query: {q}")
-                for url in ddg_search_pdf_urls(q):
-                    if not is_relevant_pdf(url, curr_title, composer):
-                        print(f"      ↳ Skipping irrelevant PDF: {url}")
+                index[fn] = [fp[0], os.stat(path).st_mtime_ns, fp[1]]
+                async with lock:
+                    saved += 1
+                    counters[source] += 1
+                    print(f"      {tag}[REPORT] {label} count = {counters[source]}")
+
+        def search_waves(curr_title):
+            """
+            The searches for curr_title, split into waves: the first holds
+            DDG_WAVE_SIZE DuckDuckGo queries plus IMSLP, Archive and Mutopia,
+            and each later one the next DDG_WAVE_SIZE queries.  Entries are
+            (source, label, search function, args), so a wave that is
+            never issued never creates its coroutines.
+            """
+            # templates can format to the same query; issue each only once
+            queries = list(dict.fromkeys(tmpl.format(title=curr_title, composer=composer)
+                                         for tmpl in TEMPLATES))
+            ddg = [('DDG', 'DuckDuckGo', ddg_search_pdf_urls, (q,)) for q in queries]
+            fallbacks = [
+                ('IMSLP',   'IMSLP',   search_imslp,       (curr_title, composer)),
+                ('Archive', 'Archive', search_archive_org, (curr_title, composer)),
+                ('Mutopia', 'Mutopia', search_mutopia,     (curr_title, composer)),
+            ]
+            waves = [ddg[i:i + DDG_WAVE_SIZE] for i in range(0, len(ddg), DDG_WAVE_SIZE)]
+            if not waves:
+                waves = [[]]
+            waves[0] += fallbacks
+            return waves
+
+        async def collect_candidates(wave, words):
+            """Run one wave of searches at once; pool the new relevant URLs."""
+            async def run(label, func, args):
+                try:
+                    return await func(session, *args)
+                except Exception as e:
+                    print(f"      {tag}⚠ {label} search failed ({e!r}), skipping")
+                    return []
+
+            results = await asyncio.gather(*[run(label, func, args)
+                                             for _, label, func, args in wave])
+            for (source, label, _, _), urls in zip(wave, results):
+                for url in urls:
+                    if url in pool:
                         continue
-                    if saved >= MAX_PDFS_PER_PIECE:
-                        return
-                    remote_name = sanitize_filename(os.path.basename(urlparse(url).path))
-                    fn = f"{level} - {sanitize_filename(title)} - {sanitize_filename(composer)} - {remote_name}"
-                    path = os.path.join(OUTPUT_DIR, fn)
-                    if maybe_download_pdf(url, path, seen_sizes):
-                        saved += 1
-                        counters['DDG'] += 1
-                        print(f"      [REPORT] DuckDuckGo count = {counters['DDG']}")
-                    time.sleep(DOWNLOAD_DELAY)
-
-            # 2) IMSLP
-            if saved < MAX_PDFS_PER_PIECE:
-                print("  • Falling fallback to IMSLP")
-                for url in search_imslp(curr_title, composer):
-                    if not is_relevant_pdf(url, curr_title, composer):
-                        print(f"      ↳ Skipping irrelevant PDF: {url}")
-                        continue
-                    if saved >= MAX_PDFS_PER_PIECE:
-                        return
-                    remote_name = sanitize_filename(os.path.basename(urlparse(url).path))
-                    fn = f"{level} - {sanitize_filename(title)} - {sanitize_filename(composer)} - {remote_name}"
-                    path = os.path.join(OUTPUT_DIR, fn)
-                    if maybe_download_pdf(url, path, seen_sizes):
-                        saved += 1
-                        counters['IMSLP'] += 1
-                        print(f"      [REPORT] IMSLP count = {counters['IMSLP']}")
-                    time.sleep(DOWNLOAD_DELAY)
-
-            # 3) Internet Archive
-            if saved < MAX_PDFS_PER_PIECE:
-                print("  • Falling fallback to Internet Archive")
-                for url in search_archive_org(curr_title, composer):
-                    if not is_relevant_pdf(url, curr_title, composer):
-                        print(f"      ↳ Skipping irrelevant PDF: {url}")
+                    if not is_relevant_pdf(url, words, comp_key):
+                        print(f"      {tag}↳ Skipping irrelevant PDF: {url}")
                         continue
-                    if saved >= MAX_PDFS_PER_PIECE:
-                        return
-                    remote_name = sanitize_filename(os.path.basename(urlparse(url).path))
-                    fn = f"{level} - {sanitize_filename(title)} - {sanitize_filename(composer)} - {remote_name}"
-                    path = os.path.join(OUTPUT_DIR, fn)
-                    if maybe_download_pdf(url, path, seen_sizes):
-                        saved += 1
-                        counters['Archive'] += 1
-                        print(f"      [REPORT] Archive count = {counters['Archive']}")
-                    time.sleep(DOWNLOAD_DELAY)
-
-            # 4) Mutopia
-            if saved < MAX_PDFS_PER_PIECE:
-                print("  • Falling fallback to Mutopia")
-                for url in search_mutopia(curr_title, composer):
-                    if not is_relevant_pdf(url, curr_title, composer):
-                        print(f"      ↳ Skipping irrelevant PDF: {url}")
+                    pool[url] = (score(url, source), source, label)
+
+        async def download_best():
+            """Probe and download untried pool entries, best score first."""
+            # sort is stable, so equal scores keep the order results came in
+            ranked = sorted(((url, c) for url, c in pool.items() if url not in tried),
+                            key=lambda item: item[1][0], reverse=True)
+            while ranked and saved < MAX_PDFS_PER_PIECE:
+                window, ranked = ranked[:PROBE_WINDOW], ranked[PROBE_WINDOW:]
+                urls = [url for url, _ in window]
+                tried.update(urls)
+
+                # a size seen before (on disk or earlier in this window) is a
+                # likely duplicate, so those wait until the rest are done
+                sizes = await head_many(session, urls)
+                unique, likely_dupes, batch_sizes = [], [], set()
+                for (url, (_, source, label)), size in zip(window, sizes):
+                    if size is not None and (size in seen or size in batch_sizes):
+                        likely_dupes.append((source, label, url, size))
                         continue
+                    if size is not None:
+                        batch_sizes.add(size)
+                    unique.append((source, label, url, size))
+
+                # download only as many as are still missing; top up on failures
+                while unique and saved < MAX_PDFS_PER_PIECE:
+                    need = MAX_PDFS_PER_PIECE - saved
+                    batch, unique = unique[:need], unique[need:]
+                    await asyncio.gather(*[fetch(*c) for c in batch])
+
+                # then the likely duplicates, one at a time: by now whatever
+                # they match is in seen, so maybe_download_pdf can reject
+                # them on a ranged fingerprint instead of a full download
+                for c in likely_dupes:
                     if saved >= MAX_PDFS_PER_PIECE:
-                        return
-                    remote_name = sanitize_filename(os.path.basename(urlparse(url).path))
-                    fn = f"{level} - {sanitize_filename(title)} - {sanitize_filename(composer)} - {remote_name}"
-                    path = os.path.join(OUTPUT_DIR, fn)
-                    if maybe_download_pdf(url, path, seen_sizes):
-                        saved += 1
-                        counters['Mutopia'] += 1
-                        print(f"      [REPORT] Mutopia count = {counters['Mutopia']}")
-                    time.sleep(DOWNLOAD_DELAY)
+                        break
+                    await fetch(*c)
 
         try:
-            # first pass: full title
-            try_search(title)
-
-            # then progressively trim
-            words = title.split()
-            while saved < MAX_PDFS_PER_PIECE and len(words) > 1:
-                words.pop()
-                shortened = " ".join(words)
-                print(f"  • Falling back with shortened title: {shortened!r}")
-                try_search(shortened)
-
-            print(f"  ✔ {saved} unique PDF(s) saved for “{title}”")
+            # full title first, then progressively trimmed ones; every pass
+            # adds to the same pool, and only URLs not probed yet are tried
+            for curr_title in title_variants(title):
+                if curr_title != title:
+                    print(f"  {tag}• Falling back with shortened title: {curr_title!r}")
+                words = title_words(curr_title)
+                # rank and download after every wave, so no further query is
+                # sent once the piece is full
+                for wave in search_waves(curr_title):
+                    await collect_candidates(wave, words)
+                    await download_best()
+                    if saved >= MAX_PDFS_PER_PIECE:
+                        break
+                if saved >= MAX_PDFS_PER_PIECE:
+                    break
+
+            print(f"  {tag}✔ {saved} unique PDF(s) saved")
         except Exception as e:
-            print(f"  ❌ Unhandled error for “{title}”: {e!r}")
+            print(f"  {tag}❌ Unhandled error: {e!r}")
 
-        # after all attempts, categorize row
-        if saved < MAX_PDFS_PER_PIECE:
-            incomplete_rows.append(row)
-        else:
-            complete_rows.append(row)
+        return saved >= MAX_PDFS_PER_PIECE
 
-        time.sleep(ENTRY_DELAY)
+async def main():
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    # rewrite CSV so incomplete entries go last
-    with open(INPUT_CSV, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.writer(csvfile)
-        for r in complete_rows + incomplete_rows:
-            writer.writerow(r)
+    # counters for real-time report
+    counters = {
+        'DDG':       0,
+        'IMSLP':     0,
+        'Archive':   0,
+        'Mutopia':   0
+    }
+
+    # read all entries (no header row)
+    with open(INPUT_CSV, newline='', encoding='utf-8') as csvfile:
+        reader = csv.reader(csvfile)
+        rows = list(reader)
+
+    # one directory scan up front instead of a glob per piece
+    keys = [piece_fields(row)[3] for row in rows]
+    prefixes = {piece_prefix(*key): key for key in keys}
+    index = load_dedupe_index()
+    buckets = scan_output_dir(prefixes, index)
+
+    # rows sharing a key would write the same files, so each key runs
+    # once (first row wins) and its result applies to all of its rows
+    first_rows = {}
+    for row, key in zip(rows, keys):
+        first_rows.setdefault(key, row)
+
+    sem = asyncio.Semaphore(PIECE_CONCURRENCY)
+    try:
+        async with make_session() as session:
+            tasks = [process_piece(row, session, sem, counters,
+                                   buckets.get(key, []), index)
+                     for key, row in first_rows.items()]
+            done = dict(zip(first_rows, await asyncio.gather(*tasks)))
+    finally:
+        await close_imslp_client()
+        save_dedupe_index(index)
+
+    # after all attempts, categorize rows (keeping input order)
+    complete_rows = [row for row, key in zip(rows, keys) if done[key]]
+    incomplete_rows = [row for row, key in zip(rows, keys) if not done[key]]
+
+    # rewrite CSV so incomplete entries go last -- only if the order
+    # changed, and via a temp file + rename so a crash can't truncate it
+    ordered = complete_rows + incomplete_rows
+    if ordered == rows:
+        return
+    tmp = INPUT_CSV + '.tmp'
+    with open(tmp, 'w', newline='', encoding='utf-8') as csvfile:
+        csv.writer(csvfile).writerows(ordered)
+    os.replace(tmp, INPUT_CSV)
 
 if __name__ == '__main__':
-    main()
+    asyncio.run(main())